@@ -5,15 +5,22 @@ from __future__ import annotations
 # Roadmap ALWAYS visible | Priority sorted | Editor + Report
 # ==========================================================
 
+import io
+import queue
 import re
-from contextlib import contextmanager
+import threading
+import time
+from contextlib import contextmanager, suppress
 from datetime import datetime, date
+from itertools import product
 
 import pandas as pd
-import plotly.express as px
+import plotly.io as pio
 import streamlit as st
 import sqlitecloud
 
+pio.json.config.default_engine = "orjson"  # C serializer for figure JSON (see requirements)
+
 # ==========================================================
 # Streamlit config
 # ==========================================================
@@ -37,6 +44,13 @@ PRESET_PILLARS = [
 ]
 
 PRESET_STATUSES = ["Idea", "Planned", "In Progress", "Completed"]
+PILLAR_OPTIONS = [ALL_LABEL] + PRESET_PILLARS
+STATUS_OPTIONS = [ALL_LABEL] + PRESET_STATUSES
+PRIORITY_OPTIONS = [ALL_LABEL] + [str(i) for i in range(1, 10)]
+EDITOR_STATUS_OPTIONS = [""] + PRESET_STATUSES
+PAGE_SIZES = [25, 50, 100]
+PILLAR_SET = frozenset(PRESET_PILLARS)
+STATUS_SET = frozenset(PRESET_STATUSES)
 JJMD_PATTERN = re.compile(r"^JJMD-\d{7}$", re.IGNORECASE)
 
 EXPECTED_COLUMNS = {
@@ -55,6 +69,83 @@ EXPECTED_COLUMNS = {
     "updated_at": "TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP",
 }
 
+# Secondary indexes backing the sidebar filters and the editor's name ordering
+INDEXES = {
+    "idx_projects_status": "status",
+    "idx_projects_priority": "priority",
+    "idx_projects_name_nocase": "name COLLATE NOCASE",
+    # Same column order as fetch_filtered's equality filters
+    "idx_projects_filters": "pillar, status, priority",
+}
+
+# Only what the roadmap plots; ordering by priority happens in SQL
+ROADMAP_COLS = ("name", "pillar", "start_date", "due_date")
+
+# Full-text index over name/description, kept in sync with the table by triggers
+FTS_TABLE = f"{TABLE}_fts"
+FTS_DDL = (
+    f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(name, description, content='{TABLE}', content_rowid='id')",
+    f"""CREATE TRIGGER {FTS_TABLE}_ai AFTER INSERT ON {TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, name, description) VALUES (new.id, new.name, new.description);
+    END""",
+    f"""CREATE TRIGGER {FTS_TABLE}_ad AFTER DELETE ON {TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, description) VALUES ('delete', old.id, old.name, old.description);
+    END""",
+    f"""CREATE TRIGGER {FTS_TABLE}_au AFTER UPDATE ON {TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, description) VALUES ('delete', old.id, old.name, old.description);
+        INSERT INTO {FTS_TABLE}(rowid, name, description) VALUES (new.id, new.name, new.description);
+    END""",
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+)
+
+# Report table/exports show the canonical columns, not legacy extras left in the table
+REPORT_COLS = tuple(EXPECTED_COLUMNS)
+
+# Editable columns, in bind order for INSERT_SQL / UPDATE_SQL
+PROJECT_COLS = (
+    "name",
+    "pillar",
+    "priority",
+    "description",
+    "owner",
+    "status",
+    "start_date",
+    "due_date",
+    "plainsware_project",
+    "plainsware_number",
+)
+
+INSERT_SQL = (
+    f"INSERT INTO {TABLE} ({','.join(PROJECT_COLS)},created_at,updated_at) "
+    f"VALUES ({','.join('?' * len(PROJECT_COLS))},?,?)"
+)
+UPDATE_SQL = f"UPDATE {TABLE} SET {','.join(c + '=?' for c in PROJECT_COLS)},updated_at=? WHERE id=?"
+DELETE_SQL = f"DELETE FROM {TABLE} WHERE id=?"
+SELECT_ONE_SQL = f"SELECT id,{','.join(PROJECT_COLS)} FROM {TABLE} WHERE id=?"
+PROJECT_LIST_SQL = f"SELECT id, name FROM {TABLE} ORDER BY name COLLATE NOCASE"
+
+# Sorting happens in SQL; "x IS NULL, x" keeps NULLs last like pandas' sort_values.
+# id is the unique tie-breaker so LIMIT/OFFSET pages never repeat or skip tied rows.
+REPORT_ORDER = "priority IS NULL, priority, pillar IS NULL, pillar, name IS NULL, name, id"
+ROADMAP_SQL = (
+    f"SELECT {','.join(ROADMAP_COLS)} FROM {TABLE} "
+    "WHERE start_date <> '' AND due_date <> '' "  # also excludes NULLs
+    "ORDER BY priority IS NULL, priority, start_date, name"
+)
+
+# ==========================================================
+# Session state (initialised once per session, in one pass)
+# ==========================================================
+SESSION_DEFAULTS = {
+    "_rec_cache": None,     # (pid, record) for the editor's selected project
+    "_loaded_id": -1,       # id currently loaded into the editor widgets; -1 = none yet
+    "_csv_filters": None,   # filter set the CSV export was requested for
+}
+
+for _k, _v in SESSION_DEFAULTS.items():
+    if _k not in st.session_state:
+        st.session_state[_k] = _v
+
 # ==========================================================
 # Helpers
 # ==========================================================
@@ -63,6 +154,8 @@ def now_ts():
 
 
 def safe_int(x, default=5):
+    if type(x) is int:  # SQLite INTEGER values arrive as int already
+        return x
     try:
         return int(x)
     except Exception:
@@ -70,16 +163,25 @@ def safe_int(x, default=5):
 
 
 def to_iso(d):
-    return d.strftime("%Y-%m-%d") if d else ""
+    return d.isoformat() if d else ""
 
 
 def try_date(v):
+    if isinstance(v, date):
+        return v
+    if not v:
+        return None
     try:
-        return datetime.strptime(str(v), "%Y-%m-%d").date()
-    except Exception:
+        return date.fromisoformat(str(v))
+    except ValueError:
         return None
 
 
+def fts_query(text):
+    # Each word becomes a quoted prefix term, so FTS5 operators in user input stay literal
+    return " ".join('"{}"*'.format(t.replace('"', '""')) for t in text.split())
+
+
 def validate_plainsware(plainsware_project, plainsware_number):
     if str(plainsware_project).strip().lower() == "yes":
         if not plainsware_number:
@@ -102,186 +204,419 @@ def _get_sqlitecloud_url():
     return url
 
 
+def _connect():
+    # Per-connection setup lives here so it runs once per handle, not per query
+    c = sqlitecloud.connect(_get_sqlitecloud_url())
+    db_name = (st.secrets.get("SQLITECLOUD_DB_PORTFOLIO") or "").strip()
+    if db_name:
+        c.execute(f'USE DATABASE "{db_name}"')
+    return c
+
+
+# Small shared pool: sessions' reads run concurrently, each handle used by one thread at a time.
+# Streamlit starts a new thread per script run, so per-thread handles would reconnect every rerun.
+POOL_SIZE = 4
+IDLE_PROBE_SECS = 30  # handles idle longer than this are checked before reuse
+
+
+@st.cache_resource(show_spinner=False)
+def _pool():
+    # One process-wide pool; a None slot means "no handle opened yet / dropped"
+    slots = queue.LifoQueue()
+    for _ in range(POOL_SIZE):
+        slots.put(None)
+    return slots
+
+
+@st.cache_resource(show_spinner=False)
+def _write_lock():
+    # Writes stay serialized so BEGIN IMMEDIATE never races another session's transaction
+    return threading.Lock()
+
+
+def _alive(c):
+    try:
+        c.execute("SELECT 1")
+        return True
+    except Exception:
+        with suppress(Exception):
+            c.close()
+        return False
+
+
+def _checkout():
+    slot = _pool().get()  # blocks while every handle is busy
+    try:
+        c, last_used = slot or (None, 0.0)
+        # An idle socket may have been dropped server-side; catch that before the caller's query
+        if c is not None and time.monotonic() - last_used > IDLE_PROBE_SECS and not _alive(c):
+            c = None
+        return c or _connect()
+    except BaseException:
+        _pool().put(None)  # give the slot back if reconnecting failed
+        raise
+
+
 @contextmanager
 def conn():
-    c = None
     try:
-        c = sqlitecloud.connect(_get_sqlitecloud_url())
-        db_name = (st.secrets.get("SQLITECLOUD_DB_PORTFOLIO") or "").strip()
-        if db_name:
-            c.execute(f'USE DATABASE "{db_name}"')
-        yield c
+        c = _checkout()
+        try:
+            yield c
+        except Exception:
+            # SQL errors and caller bugs keep the handle; only a dead one is closed and dropped
+            if not _alive(c):
+                c = None
+            raise
+        finally:
+            _pool().put((c, time.monotonic()) if c is not None else None)
     except Exception as e:
         st.error("Database connection failed")
         st.exception(e)
         st.stop()
-    finally:
-        if c:
-            c.close()
+
+
+@contextmanager
+def transaction():
+    # Explicit write transaction: one commit per unit of work, rolled back on error
+    with _write_lock(), conn() as c:
+        c.execute("BEGIN IMMEDIATE")
+        try:
+            yield c
+            c.execute("COMMIT")
+        except BaseException:
+            # A failed COMMIT must not leave the shared handle inside an open transaction;
+            # a failing ROLLBACK must not hide the original error
+            with suppress(Exception):
+                c.execute("ROLLBACK")
+            raise
 
 
 # ==========================================================
 # Schema safety (NO DATA LOSS)
 # ==========================================================
+@st.cache_resource(show_spinner=False)
 def ensure_schema():
-    with conn() as c:
+    # Runs once per process; all DDL shares a single transaction
+    with transaction() as c:
         c.execute(
             f"CREATE TABLE IF NOT EXISTS {TABLE} (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT, pillar TEXT)"
         )
-        cols = pd.read_sql_query(f"PRAGMA table_info({TABLE})", c)["name"].tolist()
-        for col, ddl in EXPECTED_COLUMNS.items():
-            if col not in cols:
-                c.execute(f"ALTER TABLE {TABLE} ADD COLUMN {col} {ddl}")
+        cols = [r[1] for r in c.execute(f"PRAGMA table_info({TABLE})").fetchall()]
+        indexes = [r[1] for r in c.execute(f"PRAGMA index_list({TABLE})").fetchall()]
+        has_fts = c.execute(
+            "SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (FTS_TABLE,)
+        ).fetchone()
+        ddl_batch = [
+            f"ALTER TABLE {TABLE} ADD COLUMN {col} {ddl}"
+            for col, ddl in EXPECTED_COLUMNS.items()
+            if col not in cols
+        ] + [
+            f"CREATE INDEX {idx} ON {TABLE}({cols_sql})"
+            for idx, cols_sql in INDEXES.items()
+            if idx not in indexes
+        ] + ([] if has_fts else list(FTS_DDL))
+        for stmt in ddl_batch:
+            c.execute(stmt)
+        if ddl_batch:
+            c.execute(f"ANALYZE {TABLE}")
+    return True
 
 ensure_schema()
 
 # ==========================================================
 # Data loading
 # ==========================================================
-def fetch_all():
+def read_df(c, q, args=()):
+    # Plain cursor read; skips read_sql_query's per-call wrapper and dtype inference
+    cur = c.execute(q, args)
+    df = pd.DataFrame(cur.fetchall(), columns=[d[0] for d in cur.description])
+    if "priority" in df:
+        df["priority"] = pd.to_numeric(df["priority"], errors="coerce", downcast="integer")
+    return df
+
+
+@st.cache_data(ttl=300, show_spinner=False)
+def fetch_roadmap():
+    with conn() as c:
+        df = read_df(c, ROADMAP_SQL)
+    # Parsed here so the cached frame carries timestamps; reruns don't re-parse
+    df["Start"] = pd.to_datetime(df["start_date"], format="%Y-%m-%d", errors="coerce", cache=True)
+    df["End"] = pd.to_datetime(df["due_date"], format="%Y-%m-%d", errors="coerce", cache=True)
+    return df
+
+
+# WHERE fragment per filter, in the order fetch_filtered binds its args
+FILTER_CLAUSES = (
+    "pillar=?",
+    "status=?",
+    "priority=?",
+    f"id IN (SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH ?)",
+)
+
+# Statements for every filter combination (16 shapes), keyed by filter_args' shape tuple
+FILTER_WHERE = {
+    shape: " WHERE " + " AND ".join(c for c, on in zip(FILTER_CLAUSES, shape) if on) if any(shape) else ""
+    for shape in product((False, True), repeat=len(FILTER_CLAUSES))
+}
+FILTERED_SQL = {
+    shape: f"SELECT {','.join(REPORT_COLS)} FROM {TABLE}{where} ORDER BY {REPORT_ORDER}"
+    for shape, where in FILTER_WHERE.items()
+}
+PAGED_SQL = {shape: q + " LIMIT ? OFFSET ?" for shape, q in FILTERED_SQL.items()}
+KPI_SQL = {
+    shape: f"SELECT COUNT(*), COALESCE(SUM(status = 'Completed'), 0), AVG(priority) FROM {TABLE}{where}"
+    for shape, where in FILTER_WHERE.items()
+}
+
+
+def filter_args(filters):
+    shape, args = [], []
+
+    for key in ("pillar", "status", "priority"):
+        active = filters[key] != ALL_LABEL
+        shape.append(active)
+        if active:
+            args.append(int(filters[key]) if key == "priority" else filters[key])
+    search = filters["search"].strip()
+    shape.append(bool(search))
+    if search:
+        args.append(fts_query(search))
+
+    return tuple(shape), args
+
+
+@st.cache_data(ttl=300, show_spinner=False)
+def fetch_filtered(filters, limit=None, offset=0):
+    shape, args = filter_args(filters)
+    q = FILTERED_SQL[shape]
+    if limit is not None:
+        q = PAGED_SQL[shape]
+        args += [limit, offset]
+
+    with conn() as c:
+        return read_df(c, q, args)
+
+
+@st.cache_data(ttl=300, show_spinner=False)
+def fetch_kpis(filters):
+    # Aggregated in SQLite; no rows are materialized just to count them
+    shape, args = filter_args(filters)
     with conn() as c:
-        return pd.read_sql_query(f"SELECT * FROM {TABLE}", c)
-
-
-def fetch_filtered(filters):
-    q = f"SELECT * FROM {TABLE}"
-    args, where = [], []
-
-    if filters["pillar"] != ALL_LABEL:
-        where.append("pillar=?")
-        args.append(filters["pillar"])
-    if filters["status"] != ALL_LABEL:
-        where.append("status=?")
-        args.append(filters["status"])
-    if filters["priority"] != ALL_LABEL:
-        where.append("priority=?")
-        args.append(int(filters["priority"]))
-    if filters["search"]:
-        s = f"%{filters['search'].lower()}%"
-        where.append("(LOWER(name) LIKE ? OR LOWER(description) LIKE ?)")
-        args.extend([s, s])
-
-    if where:
-        q += " WHERE " + " AND ".join(where)
+        return c.execute(KPI_SQL[shape], args).fetchone()
 
+
+@st.cache_data(ttl=300, show_spinner=False)
+def fetch_project_list():
+    # Selector only needs (id, name) tuples; no DataFrame
+    with conn() as c:
+        return [(i, n) for i, n in c.execute(PROJECT_LIST_SQL).fetchall()]
+
+
+def get_project(pid):
+    # Reruns fire on every widget edit; reuse the row while the selection is unchanged
+    cached = st.session_state["_rec_cache"]
+    if cached and cached[0] == pid:
+        return cached[1]
     with conn() as c:
-        return pd.read_sql_query(q, c, params=args)
+        cur = c.execute(SELECT_ONE_SQL, (pid,))
+        row = cur.fetchone()
+        rec = dict(zip([d[0] for d in cur.description], row)) if row else {}
+    if rec:
+        # Parse the form's dates once per load rather than on every rerun
+        rec["_start"] = try_date(rec.get("start_date"))
+        rec["_due"] = try_date(rec.get("due_date"))
+    st.session_state["_rec_cache"] = (pid, rec)
+    return rec
+
+
+def invalidate_project_cache():
+    # Called after every write; cache_data entries are process-wide, so other sessions refresh too
+    st.session_state["_rec_cache"] = None
+    st.session_state["_csv_filters"] = None
+    fetch_project_list.clear()
+    fetch_roadmap.clear()
+    fetch_filtered.clear()
+    fetch_kpis.clear()
+    report_csv.clear()
+
+# ==========================================================
+# CRUD
+# ==========================================================
+def insert_projects(rows):
+    # Any number of rows in one transaction; new ids come back on the cursor, in row order
+    ts = now_ts()
+    with transaction() as c:
+        ids = [c.execute(INSERT_SQL, (*values, ts, ts)).lastrowid for values in rows]
+    invalidate_project_cache()
+    return ids
+
+
+def insert_project(values):
+    return insert_projects([values])[0]
+
+
+def update_project(pid, values):
+    with transaction() as c:
+        c.execute(UPDATE_SQL, (*values, now_ts(), pid))
+    invalidate_project_cache()
+
+
+def delete_project(pid):
+    with transaction() as c:
+        c.execute(DELETE_SQL, (pid,))
+    invalidate_project_cache()
+
+# ==========================================================
+# Charts
+# ==========================================================
+@st.cache_data(ttl=300, max_entries=2, show_spinner=False)
+def roadmap_figure_json(rm):
+    # Keyed on the roadmap frame's hash; unchanged data skips the Plotly rebuild.
+    # Each write yields a new hash, so old figures are evicted rather than kept for the process lifetime.
+    import plotly.express as px  # heavy; only needed on a cache miss
+
+    fig = px.timeline(
+        rm,
+        x_start="Start",
+        x_end="End",
+        y="name",
+        color="pillar",
+    )
+    fig.update_yaxes(autorange="reversed")
+    return fig.to_json()
+
+# ==========================================================
+# Exports
+# ==========================================================
+@st.cache_data(ttl=300, show_spinner=False)
+def report_csv(filters):
+    # Encoded once per filter set / data change; pandas writes bytes directly, no str copy
+    buf = io.BytesIO()
+    fetch_filtered(filters).to_csv(buf, index=False, encoding="utf-8")
+    return buf.getvalue()
 
 # ==========================================================
 # Sidebar Filters
 # ==========================================================
 st.sidebar.header("Filters")
 
-filters = {
-    "pillar": st.sidebar.selectbox("Pillar", [ALL_LABEL] + PRESET_PILLARS),
-    "status": st.sidebar.selectbox("Status", [ALL_LABEL] + PRESET_STATUSES),
-    "priority": st.sidebar.selectbox("Priority", [ALL_LABEL] + [str(i) for i in range(1, 10)]),
-    "search": st.sidebar.text_input("Search"),
-}
+# Inside a form, keystrokes in Search don't rerun the app; values apply on submit
+with st.sidebar.form("filters"):
+    filters = {
+        "pillar": st.selectbox("Pillar", PILLAR_OPTIONS),
+        "status": st.selectbox("Status", STATUS_OPTIONS),
+        "priority": st.selectbox("Priority", PRIORITY_OPTIONS),
+        "search": st.text_input("Search"),
+    }
+    st.form_submit_button("Apply")
 
-data_all = fetch_all()                     # ✅ Roadmap source (never filtered)
-data_filtered = fetch_filtered(filters)    # ✅ Table / KPIs / Report
+data_all = fetch_roadmap()                 # ✅ Roadmap source (never filtered)
 
 # ==========================================================
 # Project Editor
 # ==========================================================
 st.subheader("✏️ Project Editor")
 
-with conn() as c:
-    plist = pd.read_sql_query(f"SELECT id, name FROM {TABLE}", c)
 
-opts = [NEW_LABEL] + [f"{r.id} — {r.name}" for r in plist.itertuples(index=False)]
-sel = st.selectbox("Select Project", opts)
-
-loaded, pid = {}, None
-if sel != NEW_LABEL:
-    pid = int(sel.split(" — ")[0])
-    with conn() as c:
-        df = pd.read_sql_query(f"SELECT * FROM {TABLE} WHERE id=?", c, params=[pid])
-    if not df.empty:
-        loaded = df.iloc[0].to_dict()
-
-c1, c2 = st.columns(2)
-
-with c1:
-    name = st.text_input("Name*", loaded.get("name", ""))
-    pillar = st.selectbox("Pillar*", PRESET_PILLARS, index=PRESET_PILLARS.index(loaded.get("pillar")) if loaded.get("pillar") in PRESET_PILLARS else 0)
-    owner = st.text_input("Owner*", loaded.get("owner", ""))
-    priority = st.number_input("Priority", 1, 99, safe_int(loaded.get("priority", 5)))
-    desc = st.text_area("Description", loaded.get("description", ""))
-
-with c2:
-    status = st.selectbox("Status", [""] + PRESET_STATUSES)
-    sd = st.date_input("Start Date", try_date(loaded.get("start_date")) or date.today())
-    dd = st.date_input("Due Date", try_date(loaded.get("due_date")) or date.today())
-    pw = st.selectbox("Planisware Project?", ["No", "Yes"])
-    pwn = st.text_input("Planisware #", loaded.get("plainsware_number", "")) if pw == "Yes" else ""
-
-b1, b2, b3 = st.columns(3)
-
-if b1.button("Save New"):
-    pwn_db = validate_plainsware(pw, pwn)
-    with conn() as c:
-        c.execute(
-            f"""INSERT INTO {TABLE}
-            (name,pillar,priority,description,owner,status,start_date,due_date,plainsware_project,plainsware_number,created_at,updated_at)
-            VALUES (?,?,?,?,?,?,?,?,?,?,?,?)""",
-            (name,pillar,priority,desc,owner,status,to_iso(sd),to_iso(dd),pw,pwn_db,now_ts(),now_ts())
-        )
-    st.success("Project created")
-    st.rerun()
-
-if pid and b2.button("Update"):
-    pwn_db = validate_plainsware(pw, pwn)
-    with conn() as c:
-        c.execute(
-            f"""UPDATE {TABLE}
-            SET name=?,pillar=?,priority=?,description=?,owner=?,status=?,start_date=?,due_date=?,plainsware_project=?,plainsware_number=?,updated_at=?
-            WHERE id=?""",
-            (name,pillar,priority,desc,owner,status,to_iso(sd),to_iso(dd),pw,pwn_db,now_ts(),pid)
-        )
-    st.success("Project updated")
-    st.rerun()
-
-if pid and b3.button("Delete"):
-    with conn() as c:
-        c.execute(f"DELETE FROM {TABLE} WHERE id=?", (pid,))
-    st.warning("Project deleted")
-    st.rerun()
+def load_editor_state(pid, rec):
+    # Widgets use fixed keys; fill them from the record only when the selection changes
+    if st.session_state["_loaded_id"] == pid:
+        return
+    st.session_state.update({
+        "w_name": rec.get("name") or "",
+        "w_pillar": rec.get("pillar") if rec.get("pillar") in PILLAR_SET else PRESET_PILLARS[0],
+        "w_owner": rec.get("owner") or "",
+        "w_priority": min(max(safe_int(rec.get("priority", 5)), 1), 99),
+        "w_desc": rec.get("description") or "",
+        "w_status": rec.get("status") if rec.get("status") in STATUS_SET else "",
+        "w_start": rec.get("_start") or date.today(),
+        "w_due": rec.get("_due") or date.today(),
+        "w_pw": "Yes" if str(rec.get("plainsware_project")).strip().lower() == "yes" else "No",
+        "w_pwn": rec.get("plainsware_number") or "",
+        "_loaded_id": pid,
+    })
+
+
+@st.fragment
+def project_editor():
+    # Field edits rerun only this fragment, not the filters, KPIs and roadmap
+    plist = fetch_project_list()
+
+    # Options are the ids themselves; labels are only rendered, never parsed back
+    ids = [None] + [i for i, _ in plist]
+    labels = {None: NEW_LABEL, **{i: f"{i} — {n}" for i, n in plist}}
+    pid = st.selectbox("Select Project", ids, format_func=labels.__getitem__)
+
+    loaded = get_project(pid) if pid is not None else {}
+    load_editor_state(pid, loaded)
+
+    c1, c2 = st.columns(2)
+
+    with c1:
+        name = st.text_input("Name*", key="w_name")
+        pillar = st.selectbox("Pillar*", PRESET_PILLARS, key="w_pillar")
+        owner = st.text_input("Owner*", key="w_owner")
+        priority = st.number_input("Priority", 1, 99, key="w_priority")
+        desc = st.text_area("Description", key="w_desc")
+
+    with c2:
+        status = st.selectbox("Status", EDITOR_STATUS_OPTIONS, key="w_status")
+        sd = st.date_input("Start Date", key="w_start")
+        dd = st.date_input("Due Date", key="w_due")
+        pw = st.selectbox("Planisware Project?", ["No", "Yes"], key="w_pw")
+        if pw == "Yes":
+            # Streamlit drops state for unrendered widgets; restore the loaded number
+            st.session_state.setdefault("w_pwn", loaded.get("plainsware_number") or "")
+            pwn = st.text_input("Planisware #", key="w_pwn")
+        else:
+            pwn = ""
+
+    b1, b2, b3 = st.columns(3)
+
+    if b1.button("Save New"):
+        pwn_db = validate_plainsware(pw, pwn)
+        new_id = insert_project((name,pillar,priority,desc,owner,status,to_iso(sd),to_iso(dd),pw,pwn_db))
+        st.toast(f"Project {new_id} created")  # toasts survive the st.rerun() that follows
+        st.rerun()
+
+    if pid and b2.button("Update"):
+        pwn_db = validate_plainsware(pw, pwn)
+        update_project(pid, (name,pillar,priority,desc,owner,status,to_iso(sd),to_iso(dd),pw,pwn_db))
+        st.toast("Project updated")
+        st.rerun()
+
+    if pid and b3.button("Delete"):
+        delete_project(pid)
+        st.toast("Project deleted")
+        st.rerun()
+
+
+project_editor()
 
 # ==========================================================
 # KPIs
 # ==========================================================
 st.subheader("📌 KPIs")
 
+n_projects, n_completed, avg_priority = fetch_kpis(filters)
+
 k1, k2, k3 = st.columns(3)
-k1.metric("Projects", len(data_filtered))
-k2.metric("Completed", (data_filtered["status"] == "Completed").sum())
-k3.metric("Avg Priority", round(data_filtered["priority"].mean(), 1) if not data_filtered.empty else 0)
+k1.metric("Projects", n_projects)
+k2.metric("Completed", n_completed)
+k3.metric("Avg Priority", round(avg_priority, 1) if avg_priority is not None else 0)
 
 # ==========================================================
 # ROADMAP — ALWAYS VISIBLE + PRIORITY SORT ✅
 # ==========================================================
 st.subheader("🗺️ Roadmap (Priority Sorted)")
 
-rm = data_all.copy()
-rm["Start"] = pd.to_datetime(rm["start_date"], errors="coerce")
-rm["End"] = pd.to_datetime(rm["due_date"], errors="coerce")
-rm = rm.dropna(subset=["Start", "End"])
-
-rm = rm.sort_values(by=["priority", "Start", "name"])
+rm = data_all.dropna(subset=["Start", "End"])
 
 if rm.empty:
     st.info("No projects have valid Start & Due dates for roadmap.")
 else:
-    fig = px.timeline(
-        rm,
-        x_start="Start",
-        x_end="End",
-        y="name",
-        color="pillar",
-    )
-    fig.update_yaxes(autorange="reversed")
+    fig = pio.from_json(roadmap_figure_json(rm))
     st.plotly_chart(fig, use_container_width=True)
 
 # ==========================================================
@@ -289,13 +624,38 @@ else:
 # ==========================================================
 st.subheader("📑 Report")
 
-report_df = data_filtered.sort_values(by=["priority", "pillar", "name"])
-st.dataframe(report_df, use_container_width=True)
 
-st.download_button(
-    "⬇️ Download Report (CSV)",
-    data=report_df.to_csv(index=False).encode("utf-8"),
-    file_name="digital_portfolio_report.csv",
-    mime="text/csv",
-)
+@st.fragment
+def report_table(filters, total):
+    # Only the visible page is queried and sent to the browser; paging reruns just this fragment
+    # total is the KPI count, so no separate COUNT(*) query
+    p1, p2 = st.columns(2)
+    page_size = p1.selectbox("Rows per page", PAGE_SIZES, index=1)
+    pages = max(1, -(-total // page_size))
+    page = p2.number_input("Page", 1, pages, 1)
+    st.dataframe(
+        fetch_filtered(filters, page_size, (page - 1) * page_size),
+        use_container_width=True,
+    )
+    st.caption(f"{total} projects · page {page} of {pages}")
+
+
+report_table(filters, n_projects)
+
+
+@st.fragment
+def report_exports(filters):
+    # Export clicks rerun only this fragment, not the fetches, KPIs and roadmap above.
+    # The full filtered read happens only once the CSV is requested for the current filters.
+    if st.button("Prepare CSV"):
+        st.session_state["_csv_filters"] = filters
+    if st.session_state["_csv_filters"] == filters:
+        st.download_button(
+            "⬇️ Download Report (CSV)",
+            data=report_csv(filters),
+            file_name="digital_portfolio_report.csv",
+            mime="text/csv",
+        )
+
 
+report_exports(filters)